@@ -1,120 +1,358 @@
 import os
+import string
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-import yfinance as yf
+import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
 from dotenv import load_dotenv
-from groq import Groq
-from duckduckgo_search import DDGS
-import google.generativeai as genai
 
 # Explicitly load .env file
 load_dotenv(override=True)
 
+PROMPT_TEMPLATE = string.Template("""Provide a concise stock analysis and decision recommendation based on the following information:
+
+Company Details:
+- Name: $name
+- Sector: $sector
+- Market Cap: $market_cap
+
+Financial Metrics:
+- Current Price: $current_price
+- P/E Ratio: $pe_ratio
+- Dividend Yield: $dividend_yield
+
+Recent News Headlines:
+$news_summary
+
+Analysis Requirements:
+1. Provide a **clear decision recommendation** (Buy/Hold/Sell) in the first line.
+2. Summarize the **key reasons** for the recommendation in 2-3 bullet points.
+3. Keep the analysis concise and focused on actionable insights.""")
+
+# Seconds a generated analysis is reused for an identical prompt
+ANALYSIS_TTL = 900
+
+
+@st.cache_resource
+def get_gemini_model():
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+    return genai.GenerativeModel('gemini-2.0-flash-exp')
+
+
+@st.cache_resource
+def get_analysis_cache():
+    # Completed Gemini analyses keyed by (day, prompt), shared across sessions
+    return {}
+
+
+def lookup_analysis(key):
+    entry = get_analysis_cache().get(key)
+    if entry and time.monotonic() - entry[0] < ANALYSIS_TTL:
+        return entry[1]
+    return None
+
+
+def store_analysis(key, text):
+    cache = get_analysis_cache()
+    now = time.monotonic()
+    for cached_key, (created, _) in list(cache.items()):
+        if now - created >= ANALYSIS_TTL:
+            cache.pop(cached_key, None)
+    cache[key] = (now, text)
+
+
+def stream_and_store_analysis(response, key):
+    # Yield chunks as they arrive; only a fully streamed analysis is stored
+    parts = []
+    for chunk in response:
+        parts.append(chunk.text)
+        yield chunk.text
+    store_analysis(key, "".join(parts))
+
+
+@st.cache_resource
+def get_ddgs():
+    from duckduckgo_search import DDGS
+
+    # Reuse one DuckDuckGo client (and its connection pool) across reruns
+    return DDGS()
+
+
+class StockDataError(Exception):
+    """Raised when stock data for a ticker cannot be fetched."""
+
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=64)
+def fetch_history(ticker):
+    import yfinance as yf
+
+    # Daily bars rarely change intraday, so they outlive the quote data.
+    # yfinance returns an empty frame on failure; raise so it isn't cached
+    hist_data = yf.Ticker(ticker).history(period="1y")
+    if hist_data.empty:
+        raise StockDataError(f"No price history found for ticker: {ticker}")
+    return hist_data
+
+
+@st.cache_data(ttl=60, show_spinner=False, max_entries=64)
+def fetch_info(ticker):
+    import yfinance as yf
+
+    try:
+        info = yf.Ticker(ticker).info
+    except Exception as e:
+        raise StockDataError(f"Error fetching stock info: {e}") from e
+    if not info:
+        raise StockDataError(f"No data found for ticker: {ticker}")
+    return info
+
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=64)
+def fetch_recommendations(ticker):
+    import pyarrow as pa
+    import yfinance as yf
+
+    # Convert the latest recommendations to Arrow once per TTL so st.dataframe
+    # doesn't redo the pandas conversion on every render. Errors propagate so
+    # that st.cache_data never stores a failed fetch
+    recommendations = yf.Ticker(ticker).recommendations
+    if recommendations is None:
+        return pa.table({})
+    return pa.Table.from_pandas(recommendations.iloc[-5:])
+
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=64)
+def fetch_news(ticker):
+    # Only the top 3 articles are ever shown or sent to Gemini
+    return list(get_ddgs().news(
+        f"{ticker} stock news",
+        region='wt-wt',
+        safesearch='off',
+        timelimit='w',
+        max_results=3
+    ))
+
+
+def summarize_info(info):
+    market_cap = info.get('marketCap')
+    dividend_yield = info.get('dividendYield')
+    roe = info.get('returnOnEquity')
+
+    return {
+        'Basic Info': {
+            'Company Name': info.get('longName', 'N/A'),
+            'Sector': info.get('sector', 'N/A'),
+            'Industry': info.get('industry', 'N/A'),
+            'Market Cap': f"${market_cap:,}" if isinstance(market_cap, (int, float)) else 'N/A',
+        },
+        'Current Price': {
+            'Current': info.get('currentPrice', 'N/A'),
+            '52 Week High': info.get('fiftyTwoWeekHigh', 'N/A'),
+            '52 Week Low': info.get('fiftyTwoWeekLow', 'N/A'),
+        },
+        'Financial Health': {
+            'P/E Ratio': info.get('trailingPE', 'N/A'),
+            'Dividend Yield': f"{dividend_yield*100:.2f}%" if dividend_yield else 'N/A',
+            'ROE': f"{roe*100:.2f}%" if roe else 'N/A',
+        },
+    }
+
+
+def submit_stock_data_fetch(executor, ticker):
+    # Each source is cached on its own TTL; errors are raised rather than
+    # returned so that st.cache_data never stores a failed fetch
+    return {
+        'history': executor.submit(fetch_history, ticker),
+        'info': executor.submit(fetch_info, ticker),
+        'recommendations': executor.submit(fetch_recommendations, ticker),
+        'news': executor.submit(fetch_news, ticker),
+    }
+
+
+def collect_summary_data(futures):
+    # News is optional for the dashboard
+    try:
+        ddg_news = futures['news'].result()
+    except Exception:
+        ddg_news = []
+
+    return {**summarize_info(futures['info'].result()), 'News': ddg_news}
+
+
+def collect_stock_data(futures):
+    import pyarrow as pa
+
+    stock_data = collect_summary_data(futures)
+    hist_data = futures['history'].result()
+
+    # Recommendations are optional for the dashboard
+    try:
+        recommendations = futures['recommendations'].result()
+    except Exception:
+        recommendations = pa.table({})
+
+    stock_data['Recommendations'] = recommendations
+    stock_data['Historical Data'] = hist_data
+    return stock_data
+
+
+def fetch_stock_data(ticker):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        return collect_stock_data(submit_stock_data_fetch(executor, ticker))
+
+
+def prewarm_stock_data(ticker):
+    # Only fills the per-source caches; errors surface on the real fetch
+    try:
+        fetch_stock_data(ticker)
+    except Exception:
+        pass
+
+
+def _frame_fingerprint(df):
+    # Cheap cache key for price history: its shape, date range and latest bar
+    if df.empty:
+        return (0,)
+    return (len(df), df.index[0], df.index[-1], tuple(df.iloc[-1]))
+
+
+_FRAME_HASH_FUNCS = {pd.DataFrame: _frame_fingerprint}
+
+
+# Series longer than DOWNSAMPLE_ABOVE bars are merged into MAX_CANDLES buckets.
+# The current period="1y" history (~252 bars) never reaches this path.
+DOWNSAMPLE_ABOVE = 500
+MAX_CANDLES = 300
+
+
+def downsample_ohlc(hist_data, max_candles=MAX_CANDLES):
+    # Merge consecutive bars into at most max_candles buckets, keeping each
+    # bucket's first open, last close, overall high/low and total volume, so
+    # the SVG traces stay bounded however long the period is
+    n = len(hist_data)
+    if n <= DOWNSAMPLE_ABOVE:
+        return hist_data
+
+    bucket = np.arange(n) * max_candles // n
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    ends = np.append(starts[1:] - 1, n - 1)
+    return pd.DataFrame({
+        'Open': hist_data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(hist_data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(hist_data['Low'].to_numpy(), starts),
+        'Close': hist_data['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(hist_data['Volume'].to_numpy(), starts),
+    }, index=hist_data.index[starts])
+
+
+@st.cache_data(show_spinner=False, max_entries=64, hash_funcs=_FRAME_HASH_FUNCS)
+def plot_stock_price(hist_data):
+    import plotly.graph_objs as go
+
+    candles = downsample_ohlc(hist_data)
+
+    # Create interactive price chart; float32 arrays halve the payload sent
+    # to the browser
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(
+        x=candles.index,
+        open=candles['Open'].to_numpy(dtype=np.float32),
+        high=candles['High'].to_numpy(dtype=np.float32),
+        low=candles['Low'].to_numpy(dtype=np.float32),
+        close=candles['Close'].to_numpy(dtype=np.float32),
+        name='Price'
+    ))
+    fig.update_layout(
+        title='Stock Price Movement',
+        xaxis_title='Date',
+        yaxis_title='Price',
+        xaxis_rangeslider_visible=False
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False, max_entries=64, hash_funcs=_FRAME_HASH_FUNCS)
+def plot_volume_chart(hist_data):
+    import plotly.graph_objs as go
+
+    bars = downsample_ohlc(hist_data)
+
+    # Create volume chart
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=bars.index,
+        y=bars['Volume'].to_numpy(),
+        name='Volume'
+    ))
+    fig.update_layout(
+        title='Trading Volume',
+        xaxis_title='Date',
+        yaxis_title='Volume'
+    )
+    return fig
+
+
 class StockAnalysisApp:
     def __init__(self):
-        # Initialize session state variables
+        # Initialize session state variables, preferring a deep-linked ticker
         if 'ticker' not in st.session_state:
-            st.session_state.ticker = 'NVDA'
+            st.session_state.ticker = st.query_params.get('ticker', 'NVDA')
         
         st.set_page_config(page_title="Stock Analysis Dashboard", page_icon="📈", layout="wide")
-        
-        # Initialize API keys
-        self.groq_api_key = os.getenv('GROQ_API_KEY')
-        self.gemini_api_key = os.getenv('GEMINI_API_KEY')
-        
-        # Configure Gemini
-        genai.configure(api_key=self.gemini_api_key)
-        self.gemini_model = genai.GenerativeModel('gemini-2.0-flash-exp')
 
     def fetch_stock_data(self, ticker):
-        try:
-            stock = yf.Ticker(ticker)
-            
-            # Fetch historical data
-            hist_data = stock.history(period="1y")
-            
-            # Fetch info with error handling
-            try:
-                info = stock.info
-                if not info:
-                    st.error(f"No data found for ticker: {ticker}")
-                    return None
-            except Exception as e:
-                st.error(f"Error fetching stock info: {e}")
-                return None
+        return self.report_fetch_errors(fetch_stock_data, ticker)
 
-            # Fetch recommendations
-            try:
-                recommendations = stock.recommendations
-            except Exception:
-                recommendations = pd.DataFrame()
-
-            # Fetch news using DuckDuckGo
-            ddgs = DDGS()
-            ddg_news = list(ddgs.news(f"{info.get('longName', ticker)} stock news", max_results=10))
-
-            return {
-                'Basic Info': {
-                    'Company Name': info.get('longName', 'N/A'),
-                    'Sector': info.get('sector', 'N/A'),
-                    'Industry': info.get('industry', 'N/A'),
-                    'Market Cap': f"${info.get('marketCap', 'N/A'):,}",
-                },
-                'Current Price': {
-                    'Current': info.get('currentPrice', 'N/A'),
-                    '52 Week High': info.get('fiftyTwoWeekHigh', 'N/A'),
-                    '52 Week Low': info.get('fiftyTwoWeekLow', 'N/A'),
-                },
-                'Financial Health': {
-                    'P/E Ratio': info.get('trailingPE', 'N/A'),
-                    'Dividend Yield': f"{info.get('dividendYield', 'N/A')*100:.2f}%" if info.get('dividendYield') else 'N/A',
-                    'ROE': f"{info.get('returnOnEquity', 'N/A')*100:.2f}%" if info.get('returnOnEquity') else 'N/A',
-                },
-                'Recommendations': recommendations.tail(5) if not recommendations.empty else pd.DataFrame(),
-                'Historical Data': hist_data,
-                'News': ddg_news
-            }
+    def report_fetch_errors(self, fetch, *args):
+        try:
+            return fetch(*args)
+        except StockDataError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"Unexpected error fetching stock data: {e}")
-            return None
+        return None
 
-    def generate_gemini_analysis(self, stock_data, news):
+    def generate_gemini_analysis(self, stock_data, news, cached_only=False):
         try:
             # Prepare concise prompt for Gemini
-            news_summary = "\n".join([
-                f"Title: {article.get('title', 'N/A')}"
-                for article in news[:3]  # Limit to top 3 news articles
-            ])
-
-            prompt = f"""Provide a concise stock analysis and decision recommendation based on the following information:
-
-Company Details:
-- Name: {stock_data['Basic Info']['Company Name']}
-- Sector: {stock_data['Basic Info']['Sector']}
-- Market Cap: {stock_data['Basic Info']['Market Cap']}
-
-Financial Metrics:
-- Current Price: {stock_data['Current Price']['Current']}
-- P/E Ratio: {stock_data['Financial Health']['P/E Ratio']}
-- Dividend Yield: {stock_data['Financial Health']['Dividend Yield']}
-
-Recent News Headlines:
-{news_summary}
+            basic_info = stock_data['Basic Info']
+            financial_health = stock_data['Financial Health']
+            prompt = PROMPT_TEMPLATE.substitute(
+                name=basic_info['Company Name'],
+                sector=basic_info['Sector'],
+                market_cap=basic_info['Market Cap'],
+                current_price=stock_data['Current Price']['Current'],
+                pe_ratio=financial_health['P/E Ratio'],
+                dividend_yield=financial_health['Dividend Yield'],
+                news_summary="\n".join(
+                    f"Title: {article.get('title', 'N/A')}"
+                    for article in news[:3]  # Limit to top 3 news articles
+                ),
+            )
 
-Analysis Requirements:
-1. Provide a **clear decision recommendation** (Buy/Hold/Sell) in the first line.
-2. Summarize the **key reasons** for the recommendation in 2-3 bullet points.
-3. Keep the analysis concise and focused on actionable insights."""
+            # Reuse an analysis generated for the same prompt today
+            key = (datetime.now(timezone.utc).date().isoformat(), prompt)
+            cached = lookup_analysis(key)
+            if cached is not None:
+                return [cached]
+            if cached_only:
+                return None
 
-            # Generate analysis using Gemini
-            response = self.gemini_model.generate_content(
+            # Generate analysis using Gemini, streaming chunks as they arrive
+            # (the model is configured once per process, on first use)
+            response = get_gemini_model().generate_content(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=500  # Limit output length
-                )
+                stream=True,
+                generation_config={
+                    'max_output_tokens': 500  # Limit output length
+                }
             )
-            return response.text
+            return stream_and_store_analysis(response, key)
         except Exception as e:
             return f"❌ Gemini Analysis Error: {str(e)}"
 
@@ -122,9 +360,10 @@ Analysis Requirements:
         st.title("📈 Advanced Stock Analysis Dashboard with AI Decision Support")
         
         st.sidebar.header("Stock Selector")
-        st.session_state.ticker = st.sidebar.text_input(
+        st.sidebar.text_input(
             "Enter Stock Ticker", 
-            value=st.session_state.ticker
+            key='ticker',
+            on_change=self.sync_ticker_query_param
         )
         
         analysis_type = st.sidebar.radio(
@@ -132,16 +371,40 @@ Analysis Requirements:
             ["Overview", "Price Charts", "AI Decision Support"]
         )
         
-        if st.sidebar.button("Analyze Stock"):
-            stock_data = self.fetch_stock_data(st.session_state.ticker)
+        ticker = st.session_state.ticker
+
+        # Fetch the initial ticker in the background while the user is still
+        # choosing, so the first analyze hits warm caches
+        if 'prewarm' not in st.session_state:
+            st.session_state.prewarm = True
+            threading.Thread(target=prewarm_stock_data, args=(ticker,), daemon=True).start()
+
+        analyze_clicked = st.sidebar.button("Analyze Stock")
+
+        # Once a ticker has been analyzed, switching analysis type refetches
+        # through the per-source caches: a hit within their TTLs, fresh after
+        already_analyzed = ticker == st.session_state.get('last_ticker')
+
+        if analyze_clicked or already_analyzed:
+            if analysis_type == "AI Decision Support":
+                self.display_ai_decision_support(ticker, allow_generate=analyze_clicked)
+                return
+
+            stock_data = self.fetch_stock_data(ticker)
             
             if stock_data:
+                self.remember_analyzed_ticker(ticker)
                 if analysis_type == "Overview":
                     self.display_overview_section(stock_data)
-                elif analysis_type == "Price Charts":
-                    self.display_price_charts(stock_data)
                 else:
-                    self.display_ai_decision_support(stock_data)
+                    self.display_price_charts(stock_data)
+
+    def remember_analyzed_ticker(self, ticker):
+        st.session_state.last_ticker = ticker
+
+    def sync_ticker_query_param(self):
+        # Keep the ticker in the URL so the current view can be shared
+        st.query_params['ticker'] = st.session_state.ticker
 
     def display_overview_section(self, stock_data):
         st.header(f"Company Overview: {stock_data['Basic Info']['Company Name']}")
@@ -167,92 +430,94 @@ Analysis Requirements:
             fin_cols[i].metric(key, value)
         
         st.subheader("Recent Analyst Recommendations")
-        if not stock_data['Recommendations'].empty:
+        if stock_data['Recommendations'].num_rows:
             st.dataframe(stock_data['Recommendations'])
         else:
             st.write("No recent recommendations available")
 
-    def display_ai_decision_support(self, stock_data):
-        st.header(f"AI Decision Support: {stock_data['Basic Info']['Company Name']}")
-        
-        # Display News
-        st.subheader("Recent News")
-        for article in stock_data['News'][:3]:  # Show only top 3 news articles
-            st.markdown(f"""
-            **{article.get('title', 'No Title')}**
-            
-            Source: {article.get('source', 'Unknown')}
+    def display_ai_decision_support(self, ticker, allow_generate=True):
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = submit_stock_data_fetch(executor, ticker)
+
+            # Gemini only needs the quote summary and headlines, so start it
+            # as soon as those arrive rather than after the full fetch
+            stock_data = self.report_fetch_errors(collect_summary_data, futures)
+            if not stock_data:
+                return
+            analysis_future = executor.submit(
+                self.generate_gemini_analysis, stock_data, stock_data['News'],
+                cached_only=not allow_generate
+            )
+
+            st.header(f"AI Decision Support: {stock_data['Basic Info']['Company Name']}")
             
-            [Read More]({article.get('url', '#')})
+            # Display News
+            st.subheader("Recent News")
+            st.markdown("".join(
+                f"**{article.get('title', 'No Title')}**\n\n"
+                f"Source: {article.get('source', 'Unknown')}\n\n"
+                f"[Read More]({article.get('url', '#')})\n\n"
+                "---\n\n"
+                for article in stock_data['News'][:3]  # Show only top 3 news articles
+            ))
             
-            ---
-            """)
-        
-        # Generate Gemini AI Analysis
-        st.subheader("AI Agent Investment Insights")
-        with st.spinner('Generating AI-powered decision support...'):
-            ai_analysis = self.generate_gemini_analysis(stock_data, stock_data['News'])
+            # Wait for the first chunk of the Gemini AI Analysis started above
+            st.subheader("AI Agent Investment Insights")
+            with st.spinner('Generating AI-powered decision support...'):
+                response = analysis_future.result()
+
+            # Stream while the history and recommendations fetches, which this
+            # view doesn't need, are still finishing in the background
+            self.display_ai_analysis(response)
+
+        # The remaining fetches finished with the executor
+        self.remember_analyzed_ticker(ticker)
+
+    def display_ai_analysis(self, response):
+        if response is None:  # Cached analysis expired and no analyze was clicked
+            st.info("The previous analysis has expired. Click Analyze Stock to generate a new one.")
+            return
+
+        if isinstance(response, str):  # Error message from generate_gemini_analysis
+            st.error(response)
+            return
+
+        # Stream the analysis, then replace it with the formatted output
+        stream_slot = st.empty()
+        try:
+            with stream_slot.container():
+                ai_analysis = st.write_stream(response)
+        except Exception as e:
+            stream_slot.empty()
+            st.error(f"❌ Gemini Analysis Error: {str(e)}")
+            return
+        stream_slot.empty()
         
         # Format the output
-        if "❌" not in ai_analysis:  # Check for errors
-            st.markdown("### Decision Recommendation")
-            lines = ai_analysis.split("\n")
-            st.success(lines[0])  # Highlight the decision (e.g., Buy/Hold/Sell)
-            
-            st.markdown("### Key Reasons")
-            for line in lines[1:]:
-                if line.strip():  # Skip empty lines
-                    st.write(f"- {line.strip()}")
-        else:
-            st.error(ai_analysis)  # Display error message if any
+        st.markdown("### Decision Recommendation")
+        lines = ai_analysis.split("\n")
+        st.success(lines[0])  # Highlight the decision (e.g., Buy/Hold/Sell)
+        
+        st.markdown("### Key Reasons")
+        st.markdown("\n".join(
+            f"- {line.strip()}"
+            for line in lines[1:]
+            if line.strip()  # Skip empty lines
+        ))
 
     def display_price_charts(self, stock_data):
         st.header(f"Price Analysis: {stock_data['Basic Info']['Company Name']}")
         
         # Price Chart
         st.subheader("Stock Price Movement")
-        price_chart = self.plot_stock_price(stock_data['Historical Data'])
+        price_chart = plot_stock_price(stock_data['Historical Data'])
         st.plotly_chart(price_chart)
         
         # Volume Chart
         st.subheader("Trading Volume")
-        volume_chart = self.plot_volume_chart(stock_data['Historical Data'])
+        volume_chart = plot_volume_chart(stock_data['Historical Data'])
         st.plotly_chart(volume_chart)
 
-    def plot_stock_price(self, hist_data):
-        # Create interactive price chart
-        fig = go.Figure()
-        fig.add_trace(go.Candlestick(
-            x=hist_data.index,
-            open=hist_data['Open'],
-            high=hist_data['High'],
-            low=hist_data['Low'],
-            close=hist_data['Close'],
-            name='Price'
-        ))
-        fig.update_layout(
-            title='Stock Price Movement',
-            xaxis_title='Date',
-            yaxis_title='Price',
-            xaxis_rangeslider_visible=False
-        )
-        return fig
-
-    def plot_volume_chart(self, hist_data):
-        # Create volume chart
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            x=hist_data.index,
-            y=hist_data['Volume'],
-            name='Volume'
-        ))
-        fig.update_layout(
-            title='Trading Volume',
-            xaxis_title='Date',
-            yaxis_title='Volume'
-        )
-        return fig
-
     def run(self):
         self.display_dashboard()
 